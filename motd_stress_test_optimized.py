@@ -5,48 +5,117 @@
 motd_stress_test_optimized.py
 
 首先对目标 Minecraft 服务器进行一次同步 ping，渲染并显示 MOTD（Message of the Day）及在线/最大玩家数（带实际颜色输出）。
-然后进入压力测试环节，使用 ThreadPoolExecutor + mcstatus 的同步接口，测量在不同并发和 QPS 条件下的响应延迟和成功率（带颜色输出）。
+然后进入压力测试环节，使用 asyncio + mcstatus 的异步接口（async_status），测量在不同并发和 QPS 条件下的响应延迟和成功率（带颜色输出）。
 支持按 Ctrl+C 中断，并在中断时显示已完成的统计信息（带颜色输出）。
-使用自定义绿色“█”进度条动态展示“提交任务”和“收集结果”两个阶段的进度。
+使用自定义绿色“█”进度条动态展示已完成请求数的进度。
 优化点：
   - 增加 `--timeout` 和 `--retries` 参数，对每次 status 请求设置超时与重试机制。
   - 参数校验：`--host`、`--total` 必填，`--concurrency`、`--total`、`--qps` 必须为正整数。
   - 帮助信息完全汉化、丰富且带多种颜色，包含详细教程、示例和注意事项。
   - 可选 `--logfile`，将运行日志写入文件，便于事后分析。控制台仅显示 WARNING+ 级别。
-  - “收集中”阶段只在失败时打印错误到控制台，成功只写入日志文件，不再干扰进度条输出。
+  - 压测过程中只在失败时打印错误到控制台，成功只写入日志文件，不再干扰进度条输出。
   - 在 “ping” 阶段渲染 MOTD 中的 Minecraft 颜色代码（§代码）为终端 ANSI 颜色。
+  - 仅在 Windows 上使用 colorama 转换颜色，其他平台直接输出 ANSI 转义码，且每行显式重置颜色；
+    输出被重定向/管道或 NO_COLOR 为非空值时不输出任何颜色码。
+  - 压测改为单线程事件循环 + asyncio.Semaphore 限制并发，去掉线程池与统计锁。
+  - 可选 `--processes`，将压测均分到多个进程（各自运行事件循环），突破单个解释器 GIL 的限制。
+  - 可选 `--json-out` / `--csv-out` 导出机器可读的统计摘要，`--baseline` 与历史结果对比，回退时以非零状态退出。
 """
 
 import argparse
+import asyncio
+import atexit
+import csv
+import json
+import multiprocessing
+import os
+import queue
 import time
-import threading
+import signal
+import socket
 import sys
 import logging
-import re
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from collections import defaultdict
+from array import array
+from logging.handlers import QueueHandler, QueueListener
+from types import SimpleNamespace
+from concurrent.futures import ProcessPoolExecutor, wait
+from functools import lru_cache
 
-from mcstatus import JavaServer  # 确保 mcstatus 版本支持 JavaServer.status(timeout)
-from colorama import init, Fore, Style
+from mcstatus import JavaServer  # 压测阶段使用 JavaServer.async_status()
+from hdrh.histogram import HdrHistogram
 
-# 初始化 colorama，让 Windows 终端也能显示颜色
-init(autoreset=True)
 
-# 线程安全的统计数据结构
-stats_lock = threading.Lock()
+def _make_raw_ansi_namespace(enabled: bool = True):
+    """
+    构造与 colorama 的 Fore/Style 同名属性的 ANSI 转义码常量，供原生支持 ANSI 的终端直接使用。
+    enabled 为 False 时各属性均为空字符串，用于输出被重定向/管道或 NO_COLOR 为非空值的情况。
+    """
+    fore = SimpleNamespace(
+        BLACK="\x1b[30m", RED="\x1b[31m", GREEN="\x1b[32m", YELLOW="\x1b[33m",
+        BLUE="\x1b[34m", MAGENTA="\x1b[35m", CYAN="\x1b[36m", WHITE="\x1b[37m",
+        RESET="\x1b[39m",
+    )
+    style = SimpleNamespace(BRIGHT="\x1b[1m", DIM="\x1b[2m", NORMAL="\x1b[22m", RESET_ALL="\x1b[0m")
+    if not enabled:
+        fore = SimpleNamespace(**{name: "" for name in vars(fore)})
+        style = SimpleNamespace(**{name: "" for name in vars(style)})
+    return fore, style
+
+# 仅当 stdout 是终端且 NO_COLOR 未设置或为空（https://no-color.org 规定只有非空值才禁用颜色）时输出颜色，
+# 重定向到文件或管道时保持纯文本
+_USE_COLOR = sys.stdout.isatty() and not os.environ.get("NO_COLOR")
+
+if not _USE_COLOR:
+    Fore, Style = _make_raw_ansi_namespace(enabled=False)
+elif sys.platform == "win32":
+    # 只有 Windows 终端需要 colorama 包装 stdout 转换 ANSI 码；不开启 autoreset，只在需要处显式输出 RESET_ALL
+    from colorama import init, Fore, Style
+    init()
+else:
+    # Linux/macOS 终端原生支持 ANSI，直接使用转义码，避免 colorama 对每次 write 的包装开销
+    Fore, Style = _make_raw_ansi_namespace()
+
+# 统计数据结构（压测在单个事件循环线程内进行，无需加锁）
+# histogram 在 main 中按超时时间创建为 HdrHistogram（单位：纳秒），内存占用与 total 无关
+# req_per_second 为按秒计数的 array('q')，下标是相对 rps_start_sec 的秒数偏移，在 main 中预分配
+# duration_s 为正式压测（不含预热）的耗时，用于计算成功吞吐
+# min_ns / max_ns 对每个成功请求精确记录（不受 --sample-rate 影响），尚无成功请求时 min_ns 为 None
 stats = {
     "success": 0,
     "failure": 0,
-    "latencies": []
+    "duration_s": 0.0,
+    "min_ns": None,
+    "max_ns": 0,
+    "histogram": None,
+    "rps_start_sec": 0,
+    "req_per_second": array('q')
 }
 
-# 用于记录每秒实际发起的请求数
-req_per_second = defaultdict(int)
+# 与 --baseline 对比时判定为性能回退的阈值：成功吞吐下降超过 10%、P99 上升超过 20%，
+# 或成功率下降超过 1 个百分点
+BASELINE_MAX_OPS_DROP = 0.10
+BASELINE_MAX_P99_RISE = 0.20
+BASELINE_MAX_SUCCESS_RATE_DROP = 1.0
+
+# 延迟直方图默认可记录的最大值（纳秒），即 60 秒；--timeout 更大时按超时时间扩展
+LATENCY_MAX_NS = 60_000_000_000
+
+# 进度条宽度与最大重绘频率（次/秒）
+BAR_LENGTH = 40
+PROGRESS_MAX_FPS = 30
+# 预先生成的满格/空格进度条，绘制时按比例切片，避免每次重复拼接
+_BAR_FULL = '█' * BAR_LENGTH
+_BAR_EMPTY = ' ' * BAR_LENGTH
+# 上一次绘制进度条的 time.monotonic() 时间戳
+_last_draw_ts = [0.0]
+
+# 多进程模式下由父进程共享给子进程的“已完成请求数”计数器（multiprocessing.Value），单进程时为 None
+_shared_completed = None
 
-# 全局进度状态，用于重画进度条时不中断输出
-progress_lock = threading.Lock()
+# 当前 mcstatus 版本的 JavaServer.status() 是否接受 timeout 参数，启动时检测一次即可
+_STATUS_HAS_TIMEOUT = "timeout" in JavaServer.status.__code__.co_varnames
 
-# Minecraft § 颜色/格式化 代码 到 colorama ANSI 颜色/样式 的映射
+# Minecraft § 颜色/格式化 代码 到 ANSI 颜色/样式 的映射
 MC_ANSI_MAP = {
     '0': Fore.BLACK,
     '1': Fore.BLUE,
@@ -72,89 +141,123 @@ MC_ANSI_MAP = {
     'r': Style.RESET_ALL     # 重置
 }
 
+# 补齐大写代码（如 §A、§L），解析时无需逐个转换大小写
+MC_ANSI_MAP.update({code.upper(): ansi for code, ansi in list(MC_ANSI_MAP.items())})
+
+# 以 ord(代码字符) 为下标的 256 项查找表，未定义的代码为 None，解析时免去哈希查找；
+# 不输出颜色时已知代码映射为 ''，解析时照样去掉 §<code>
+_MC_TABLE = [None] * 256
+for _code, _ansi in MC_ANSI_MAP.items():
+    _MC_TABLE[ord(_code)] = _ansi
+del _code, _ansi
+
+@lru_cache(maxsize=256)
 def parse_motd(motd: str) -> str:
     """
     将 Minecraft MOTD 中的“§<code>”格式替换为对应的 ANSI 颜色/样式码，
     返回一个可以直接 print 到终端的带 ANSI 控制码的字符串。
+    按“§”切分后线性扫描每一段，不经过正则引擎；无法识别的代码原样保留。
+    同一服务器的 MOTD 通常不变，结果按输入缓存。
     """
-    def repl(match):
-        code_char = match.group(1).lower()
-        return MC_ANSI_MAP.get(code_char, '')
-    ansi = re.sub(r'§([0-9A-Frlomn])', repl, motd, flags=re.IGNORECASE)
-    return ansi + Style.RESET_ALL
-
+    segments = motd.split('§')
+    parts = [segments[0]]
+    for seg in segments[1:]:
+        # 查找表只覆盖 0~255，空段或超出范围的字符均视为无法识别
+        code = ord(seg[0]) if seg else 0
+        ansi = _MC_TABLE[code] if code < 256 else None
+        if ansi is None:
+            parts.append('§' + seg)
+        else:
+            parts.append(ansi)
+            parts.append(seg[1:])
+    return ''.join(parts) + Style.RESET_ALL
+
+
+# 彩色帮助信息在导入时一次性拼好，每行末尾补 RESET_ALL 保持逐行着色的效果，输出时只需一次 write
+_HELP_LINES = [
+    Fore.CYAN + "======================== 帮助信息 ========================",
+    Fore.YELLOW + "用法示例:",
+    Fore.YELLOW + "  python motd_stress_test_optimized.py \\",
+    Fore.YELLOW + "    --host 119.188.247.168 \\",
+    Fore.YELLOW + "    --port 20000 \\",
+    Fore.YELLOW + "    --concurrency 100 \\",
+    Fore.YELLOW + "    --total 5000 \\",
+    Fore.YELLOW + "    --qps 200 \\",
+    Fore.YELLOW + "    --timeout 5 \\",
+    Fore.YELLOW + "    --retries 1 \\",
+    Fore.YELLOW + "    --processes 4 \\",
+    Fore.YELLOW + "    --logfile test.log",
+    "",
+    Fore.CYAN + "参数说明:",
+    Fore.GREEN + "  --host, -H           " + Fore.WHITE + "目标服务器地址或 IP（必填）。",
+    Fore.GREEN + "  --port, -P           " + Fore.WHITE + "目标服务器端口，默认 " + Fore.YELLOW + "25565" + Fore.WHITE + "。",
+    Fore.GREEN + "  --concurrency, -c    " + Fore.WHITE + "并发数（最大同时查询数量），默认 " + Fore.YELLOW + "50" + Fore.WHITE + "，须为正整数。",
+    Fore.GREEN + "  --total, -n          " + Fore.WHITE + "总请求次数（必填），须为正整数。",
+    Fore.GREEN + "  --qps, -q            " + Fore.WHITE + "全局限速（每秒最大请求数），默认 " + Fore.YELLOW + "0" + Fore.WHITE + "（不限制），须为非负整数。",
+    Fore.GREEN + "  --timeout, -t        " + Fore.WHITE + "单次查询超时（秒），默认 " + Fore.YELLOW + "5.0" + Fore.WHITE + " 秒，须为正数。",
+    Fore.GREEN + "  --retries, -r        " + Fore.WHITE + "失败重试次数，默认 " + Fore.YELLOW + "0" + Fore.WHITE + " 次，须为非负整数。",
+    Fore.GREEN + "  --logfile, -l        " + Fore.WHITE + "可选：指定日志文件路径，将 INFO 及以上日志写入文件；" + Fore.CYAN + "控制台只显示 WARNING+。",
+    Fore.GREEN + "  --sample-rate, -s    " + Fore.WHITE + "延迟采样间隔：每 N 个成功请求记录 1 次延迟，默认 " + Fore.YELLOW + "1" + Fore.WHITE + "（全部记录），须为正整数；",
+    "                       " + Fore.WHITE + "成功/失败计数与最小/最大延迟始终精确；N > 1 时平均值与 P50~P99.9 基于采样，",
+    "                       " + Fore.CYAN + "当 total / N ≥ 10000 时 P99 仍具统计意义，P99.9 需要更多样本。",
+    Fore.GREEN + "  --warmup, -w         " + Fore.WHITE + "正式计时前的预热请求数（不计入统计，同样遵守 --qps 限速），默认 " + Fore.YELLOW + "0" + Fore.WHITE + "，建议 " + Fore.YELLOW + "32" + Fore.WHITE + "，须为非负整数。",
+    Fore.GREEN + "  --json-out           " + Fore.WHITE + "可选：将统计摘要（成功率、成功吞吐、P50/P95/P99/P99.9 等）以 JSON 格式写入文件。",
+    Fore.GREEN + "  --csv-out            " + Fore.WHITE + "可选：将同样的统计摘要以 CSV 格式（表头 + 一行）写入文件。",
+    Fore.GREEN + "  --baseline           " + Fore.WHITE + "可选：与之前 --json-out 生成的基线对比，" + Fore.CYAN + "成功吞吐下降 >10%、P99 上升 >20% 或成功率下降 >1 个百分点时以非零状态退出。",
+    Fore.GREEN + "  --processes, -j      " + Fore.WHITE + "压测进程数，默认 " + Fore.YELLOW + "1" + Fore.WHITE + "（单进程）；" + Fore.YELLOW + "0" + Fore.WHITE + " 表示使用全部 CPU 核心，须为非负整数。",
+    "",
+    Fore.CYAN + "功能说明:",
+    Fore.WHITE + "- 首先对目标服务器进行一次同步 ping，渲染并打印 MOTD：",
+    "    " + Fore.YELLOW + "带颜色的 MOTD 文本、在线/最大玩家数、服务端版本、Ping 延迟(ms)",
+    Fore.WHITE + "- 然后使用 asyncio 异步并发方式按给定参数进行 MOTD 查询压力测试。",
+    Fore.WHITE + "- 按 QPS 节奏发出请求，同时在途的请求数不超过 --concurrency，",
+    "  " + Fore.GREEN + "“完成”进度条" + Fore.WHITE + "实时显示已完成的请求数。",
+    Fore.WHITE + "- 成功请求延迟只写入日志文件（若指定），不再输出到控制台；失败时会在控制台以红色提示。",
+    Fore.WHITE + "- 指定 " + Fore.YELLOW + "--processes" + Fore.WHITE + " 大于 1 时，总请求数、并发数与 QPS 均分给各子进程，",
+    "  各子进程运行独立的事件循环，父进程只显示合并后的“完成”进度条并汇总统计。",
+    Fore.WHITE + "- 支持 " + Fore.YELLOW + "Ctrl+C" + Fore.WHITE + " 随时中断，程序会统计并展示已完成的请求结果。",
+    "",
+    Fore.CYAN + "具体流程:",
+    Fore.WHITE + "1. 检查并解析参数，进行基本校验。",
+    Fore.WHITE + "2. 使用 mcstatus 对服务器执行一次 status（带 timeout），并调用 parse_motd 渲染 MOTD。",
+    Fore.WHITE + "3. 显示服务器基本信息（彩色输出）。",
+    Fore.WHITE + "4. 进入压测：在事件循环中创建任务，创建前先由 asyncio.Semaphore 取得并发名额，",
+    "   每个任务调用 mcstatus.async_status() 获取 MOTD，超时/失败可重试 " + Fore.YELLOW + "--retries" + Fore.WHITE + " 次。",
+    Fore.WHITE + "5. 每个任务完成时归还名额，刷新绿色“█”“完成”进度条，并统计：",
+    "   - 成功：延迟记录到 HdrHistogram 直方图，日志写入文件（INFO）。",
+    "   - 失败：在控制台输出红色提示（ERROR），同时写日志文件。",
+    Fore.WHITE + "6. 全部完成或中断后，打印统计结果，包括：",
+    "   - 总请求数、成功数、失败数、成功率",
+    "   - 平均延迟、最小延迟、最大延迟、P50/P95/P99/P99.9 延迟",
+    "   - 每秒请求数分布（REQ/s）",
+    "",
+    Fore.CYAN + "注意事项:",
+    Fore.WHITE + "- 确保对目标服务器已获得管理员授权，避免被误判为恶意流量。",
+    Fore.WHITE + "- 如果并发数和 QPS 设置太高，可能触发防火墙或 DDOS 防护机制。",
+    Fore.WHITE + "- 建议在服务器低峰期进行测试，并监控服务器端 TPS、CPU、内存、网络带宽。",
+    Fore.WHITE + "- 若需可视化分析，查看日志文件中的延迟数据，或后续绘图。",
+    Fore.CYAN + "==========================================================",
+]
+_HELP_TEXT = "".join(line + Style.RESET_ALL + "\n" for line in _HELP_LINES)
 
 def print_colored_help():
     """
-    手动输出彩色帮助信息，包括使用说明、参数详解、示例及注意事项。
-    """
-    print(Fore.CYAN + "======================== 帮助信息 ========================")
-    print(Fore.YELLOW + "用法示例:")
-    print(Fore.YELLOW + "  python motd_stress_test_optimized.py \\")
-    print(Fore.YELLOW + "    --host 119.188.247.168 \\")
-    print(Fore.YELLOW + "    --port 20000 \\")
-    print(Fore.YELLOW + "    --concurrency 100 \\")
-    print(Fore.YELLOW + "    --total 5000 \\")
-    print(Fore.YELLOW + "    --qps 200 \\")
-    print(Fore.YELLOW + "    --timeout 5 \\")
-    print(Fore.YELLOW + "    --retries 1 \\")
-    print(Fore.YELLOW + "    --logfile test.log")
-    print()
-
-    print(Fore.CYAN + "参数说明:")
-    print(Fore.GREEN + "  --host, -H           " + Fore.WHITE + "目标服务器地址或 IP（必填）。")
-    print(Fore.GREEN + "  --port, -P           " + Fore.WHITE + "目标服务器端口，默认 " + Fore.YELLOW + "25565" + Fore.WHITE + "。")
-    print(Fore.GREEN + "  --concurrency, -c    " + Fore.WHITE + "并发线程数（最大同时查询数量），默认 " + Fore.YELLOW + "50" + Fore.WHITE + "，须为正整数。")
-    print(Fore.GREEN + "  --total, -n          " + Fore.WHITE + "总请求次数（必填），须为正整数。")
-    print(Fore.GREEN + "  --qps, -q            " + Fore.WHITE + "全局限速（每秒最大请求数），默认 " + Fore.YELLOW + "0" + Fore.WHITE + "（不限制），须为非负整数。")
-    print(Fore.GREEN + "  --timeout, -t        " + Fore.WHITE + "单次查询超时（秒），默认 " + Fore.YELLOW + "5.0" + Fore.WHITE + " 秒，须为正数。")
-    print(Fore.GREEN + "  --retries, -r        " + Fore.WHITE + "失败重试次数，默认 " + Fore.YELLOW + "0" + Fore.WHITE + " 次，须为非负整数。")
-    print(Fore.GREEN + "  --logfile, -l        " + Fore.WHITE + "可选：指定日志文件路径，将 INFO 及以上日志写入文件；" + Fore.CYAN + "控制台只显示 WARNING+。")
-    print()
-
-    print(Fore.CYAN + "功能说明:")
-    print(Fore.WHITE + "- 首先对目标服务器进行一次同步 ping，渲染并打印 MOTD：")
-    print("    " + Fore.YELLOW + "带颜色的 MOTD 文本、在线/最大玩家数、服务端版本、Ping 延迟(ms)")
-    print(Fore.WHITE + "- 然后使用多线程并发方式按给定参数进行 MOTD 查询压力测试。")
-    print(Fore.WHITE + "- 压测分两个阶段显示进度：")
-    print("    " + Fore.GREEN + "1. 提交中" + Fore.WHITE + "：将所有请求 Task 提交到线程池，实时显示“提交进度条”。")
-    print("    " + Fore.GREEN + "2. 收集中" + Fore.WHITE + "：调用 as_completed 逐一收集结果，实时显示“收集中进度条”。")
-    print(Fore.WHITE + "- 成功请求延迟只写入日志文件（若指定），不再输出到控制台；失败时会在控制台以红色提示。")
-    print(Fore.WHITE + "- 支持 " + Fore.YELLOW + "Ctrl+C" + Fore.WHITE + " 随时中断，程序会统计并展示已完成的请求结果。")
-    print()
-
-    print(Fore.CYAN + "具体流程:")
-    print(Fore.WHITE + "1. 检查并解析参数，进行基本校验。")
-    print(Fore.WHITE + "2. 使用 mcstatus 对服务器执行一次 status（带 timeout），并调用 parse_motd 渲染 MOTD。")
-    print(Fore.WHITE + "3. 显示服务器基本信息（彩色输出）。")
-    print(Fore.WHITE + "4. 进入压测：创建 ThreadPoolExecutor 并发提交任务，")
-    print("   每个任务调用 mcstatus.status() 获取 MOTD，超时/失败可重试 " + Fore.YELLOW + "--retries" + Fore.WHITE + " 次。")
-    print(Fore.WHITE + "5. 在“提交中”阶段绘制绿色“█”进度条，实时反映已提交任务数。")
-    print(Fore.WHITE + "6. 在“收集中”阶段同样绘制进度条，收集完成数并统计：")
-    print("   - 成功：延迟数据保存在 stats，日志写入文件（INFO）。")
-    print("   - 失败：在控制台输出红色提示（ERROR），同时写日志文件。")
-    print(Fore.WHITE + "7. 全部完成或中断后，打印统计结果，包括：")
-    print("   - 总请求数、成功数、失败数、成功率")
-    print("   - 平均延迟、最小延迟、最大延迟、P99 延迟")
-    print("   - 每秒请求数分布（REQ/s）")
-    print()
-
-    print(Fore.CYAN + "注意事项:")
-    print(Fore.WHITE + "- 确保对目标服务器已获得管理员授权，避免被误判为恶意流量。")
-    print(Fore.WHITE + "- 如果并发数和 QPS 设置太高，可能触发防火墙或 DDOS 防护机制。")
-    print(Fore.WHITE + "- 建议在服务器低峰期进行测试，并监控服务器端 TPS、CPU、内存、网络带宽。")
-    print(Fore.WHITE + "- 若需可视化分析，查看日志文件中的延迟数据，或后续绘图。")
-    print(Fore.CYAN + "==========================================================")
-
-def setup_logging(logfile: str = None):
+    输出彩色帮助信息，包括使用说明、参数详解、示例及注意事项（内容见 _HELP_LINES）。
+    """
+    sys.stdout.write(_HELP_TEXT)
+    sys.stdout.flush()
+
+def setup_logging(logfile: str = None, background: bool = True):
     """
     配置日志：
       - 控制台 handler 只输出 WARNING 及以上。
-      - 如果指定 logfile，则把 INFO 及以上都写入文件。
+      - 如果指定 logfile，则把 INFO 及以上都写入文件；未指定时 logger 级别设为 WARNING，INFO 调用直接短路。
+      - background=True 时文件 handler 挂在后台 QueueListener 线程上，压测热路径只把日志记录放入队列，
+        格式化与写盘都在后台完成；进程退出时由 atexit 停止监听线程并写完剩余日志。
     返回 logger 对象。
     """
     logger = logging.getLogger("motd_stress")
-    logger.setLevel(logging.INFO)
+    logger.setLevel(logging.INFO if logfile else logging.WARNING)
 
     # 控制台 handler（WARNING 及以上）
     ch = logging.StreamHandler()
@@ -167,16 +270,33 @@ def setup_logging(logfile: str = None):
         fh = logging.FileHandler(logfile, encoding="utf-8")
         fh.setLevel(logging.INFO)
         fh.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
-        logger.addHandler(fh)
+        if background:
+            log_queue = queue.SimpleQueue()
+            listener = QueueListener(log_queue, fh, respect_handler_level=True)
+            listener.start()
+            atexit.register(listener.stop)
+            logger.addHandler(QueueHandler(log_queue))
+        else:
+            logger.addHandler(fh)
 
     return logger
 
+def install_dns_cache(maxsize: int = 16):
+    """
+    用 lru_cache 包装 socket.getaddrinfo，使同一进程内对相同目标的重复解析直接命中缓存。
+    压测在一次运行内反复连接同一台服务器，解析结果视为不变，这是有意为之的取舍；
+    不适合在长期运行、目标 IP 可能变化的程序中使用。重复调用不会重复包装。
+    """
+    if hasattr(socket.getaddrinfo, "cache_info"):
+        return
+    socket.getaddrinfo = lru_cache(maxsize=maxsize)(socket.getaddrinfo)
+
 def ping_server(server: JavaServer, timeout: float):
     """
     同步 ping 一次服务器，获取 MOTD、在线人数与版本等信息。
     如果无法连接或超时，会抛出异常。
     """
-    if "timeout" in server.status.__code__.co_varnames:
+    if _STATUS_HAS_TIMEOUT:
         status = server.status(timeout=timeout)
     else:
         status = server.status()
@@ -187,22 +307,22 @@ def ping_server(server: JavaServer, timeout: float):
     latency = status.latency  # 毫秒
     return description, players_online, players_max, version_name, latency
 
-def query_motd_sync(server: JavaServer, timeout: float, retries: int, logger) -> float:
+async def query_motd_async(server: JavaServer, timeout: float, retries: int, logger) -> int:
     """
-    同步查询一次 MOTD 并返回耗时（毫秒）。如果请求失败或超时，会重试 `retries` 次。
+    异步查询一次 MOTD 并返回耗时（纳秒，time.perf_counter_ns 整数计时）。如果请求失败或超时，会重试 `retries` 次。
     最后仍失败则抛出异常，由调用者统计为失败。
+    超时由 asyncio.wait_for 控制，不依赖 mcstatus 版本是否支持 timeout 参数。
     成功日志写入文件，不输出到控制台；失败时 WARNING+ 会输出到控制台。
     """
     for attempt in range(retries + 1):
         try:
-            start = time.monotonic()
-            if "timeout" in server.status.__code__.co_varnames:
-                status = server.status(timeout=timeout)
-            else:
-                status = server.status()
-            elapsed_ms = (time.monotonic() - start) * 1000
-            logger.info(f"请求成功，延迟：{elapsed_ms:.2f} ms")
-            return elapsed_ms
+            start = time.perf_counter_ns()
+            await asyncio.wait_for(server.async_status(), timeout)
+            elapsed_ns = time.perf_counter_ns() - start
+            # 未指定 --logfile 时跳过，避免每次成功都格式化字符串
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(f"请求成功，延迟：{elapsed_ns / 1_000_000:.2f} ms")
+            return elapsed_ns
         except Exception as e:
             if attempt < retries:
                 logger.warning(f"查询失败（第 {attempt + 1} 次重试）：{e}")
@@ -210,55 +330,423 @@ def query_motd_sync(server: JavaServer, timeout: float, retries: int, logger) ->
             else:
                 raise
 
-def draw_progress(label: str, completed: int, total: int):
+async def run_one(server: JavaServer, timeout: float, retries: int, sample_rate: int, logger):
+    """
+    执行一次查询，并直接累加到 stats（事件循环为单线程，无需加锁）。
+    成功/失败计数以及最小/最大延迟始终精确；直方图只记录每 sample_rate 个成功请求中的第一个，
+    并以 sample_rate 为权重，直方图总数为 ceil(成功数 / sample_rate) * sample_rate，
+    只要有成功请求就至少有一个样本；平均值与 P50~P99.9 均基于采样估计。
+    成功返回 None，失败返回异常对象，供完成回调在控制台提示。
+    """
+    try:
+        elapsed_ns = await query_motd_async(server, timeout, retries, logger)
+    except Exception as e:
+        logger.error(f"查询失败：{e}")
+        stats["failure"] += 1
+        error = e
+    else:
+        stats["success"] += 1
+        if stats["min_ns"] is None or elapsed_ns < stats["min_ns"]:
+            stats["min_ns"] = elapsed_ns
+        if elapsed_ns > stats["max_ns"]:
+            stats["max_ns"] = elapsed_ns
+        if (stats["success"] - 1) % sample_rate == 0:
+            stats["histogram"].record_value(elapsed_ns, sample_rate)
+        error = None
+    if _shared_completed is not None:
+        # 多进程模式：实时累加共享计数，由父进程统一绘制进度条
+        with _shared_completed.get_lock():
+            _shared_completed.value += 1
+    return error
+
+async def warm_up(server: JavaServer, count: int, concurrency: int, delay_per_req: float, timeout: float, logger):
+    """
+    正式计时前发出 count 次预热请求并丢弃结果，不计入 stats，也不写“请求成功”日志。
+    让 DNS、ARP、TCP 慢启动、按需导入等一次性开销不影响 P99 / 最大延迟。
+    与正式压测相同，每次发出前等待 delay_per_req 秒，预热同样遵守 --qps 限速，不会瞬间突发。
+    """
+    semaphore = asyncio.Semaphore(min(concurrency, count))
+
+    async def one():
+        async with semaphore:
+            await asyncio.wait_for(server.async_status(), timeout)
+
+    tasks = []
+    for _ in range(count):
+        await asyncio.sleep(delay_per_req)
+        tasks.append(asyncio.ensure_future(one()))
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    failed = sum(1 for r in results if isinstance(r, Exception))
+    logger.info(f"预热完成：{count} 次请求（失败 {failed} 次），不计入统计")
+
+def draw_progress(label: str, completed: int, total: int, force: bool = False):
     """
     在一行内绘制绿色“█”进度条，并标注阶段标签（中文）。
+    终端写入较慢，重绘频率限制在 PROGRESS_MAX_FPS 以内；完成（completed == total）或 force=True 时总是绘制。
     """
-    bar_length = 40
+    now = time.monotonic()
+    if not force and completed != total and now - _last_draw_ts[0] < 1 / PROGRESS_MAX_FPS:
+        return
+    _last_draw_ts[0] = now
+
     fraction = completed / total if total > 0 else 0
-    filled_length = int(bar_length * fraction)
-    filled_bar = Fore.GREEN + '█' * filled_length + Style.RESET_ALL
-    empty_bar = ' ' * (bar_length - filled_length)
+    filled_length = int(BAR_LENGTH * fraction)
+    filled_bar = Fore.GREEN + _BAR_FULL[:filled_length] + Style.RESET_ALL
+    empty_bar = _BAR_EMPTY[filled_length:]
     percent = fraction * 100
-    with progress_lock:
-        sys.stdout.write(
-            f"\r{label}: [{filled_bar}{empty_bar}] {completed}/{total} ({percent:5.1f}%)"
-        )
-        sys.stdout.flush()
-        if completed == total:
-            print()  # 完成后换行
+    sys.stdout.write(
+        f"\r{label}: [{filled_bar}{empty_bar}] {completed}/{total} ({percent:5.1f}%)"
+    )
+    sys.stdout.flush()
+    if completed == total:
+        print()  # 完成后换行
+
+# 统计结果的两段标题，导入时拼好
+_STATS_BANNER = Fore.MAGENTA + "\n======= 当前统计结果 =======" + Style.RESET_ALL + "\n"
+_RPS_BANNER = Fore.MAGENTA + "\n===== 每秒请求数 (REQ/s) =====" + Style.RESET_ALL + "\n"
 
 def print_stats(collected_stats: dict, total_requests: int):
     """
-    计算并打印统计信息：成功率、平均延迟、最大/最小延迟、P99 延迟等，以及每秒请求数分布（带颜色输出）。
+    计算并打印统计信息：成功率、平均延迟、最大/最小延迟、P50/P95/P99/P99.9 延迟等，以及每秒请求数分布（带颜色输出）。
+    平均值与百分位从 HdrHistogram 读取（3 位有效数字精度），与请求总数无关；
+    最小/最大延迟取逐请求精确记录的 min_ns / max_ns。
+    所有行先拼入列表，最后一次性写出。
     """
     success = collected_stats["success"]
     failure = collected_stats["failure"]
-    latencies = collected_stats["latencies"]
+    hist = collected_stats["histogram"]
 
-    print(Fore.MAGENTA + "\n======= 当前统计结果 =======")
-    print(Fore.YELLOW + f"已完成请求数   : {total_requests}")
-    print(Fore.GREEN + f"成功请求数     : {success}")
-    print(Fore.RED + f"失败请求数     : {failure}")
+    lines = [
+        Fore.YELLOW + f"已完成请求数   : {total_requests}",
+        Fore.GREEN + f"成功请求数     : {success}",
+        Fore.RED + f"失败请求数     : {failure}",
+    ]
     success_rate = (success / total_requests * 100) if total_requests > 0 else 0
-    print(Fore.CYAN + f"成功率         : {success_rate:.2f}%")
-
-    if latencies:
-        avg_latency = sum(latencies) / len(latencies)
-        max_latency = max(latencies)
-        min_latency = min(latencies)
-        lat_sorted = sorted(latencies)
-        p99 = lat_sorted[int(len(lat_sorted) * 0.99) - 1] if len(lat_sorted) >= 100 else lat_sorted[-1]
-        print(Fore.YELLOW + f"平均延迟(ms)   : {avg_latency:.2f}")
-        print(Fore.YELLOW + f"最小延迟(ms)   : {min_latency:.2f}")
-        print(Fore.YELLOW + f"最大延迟(ms)   : {max_latency:.2f}")
-        print(Fore.YELLOW + f"P99 延迟(ms)   : {p99:.2f}")
+    lines.append(Fore.CYAN + f"成功率         : {success_rate:.2f}%")
+
+    if collected_stats["min_ns"] is None:
+        lines.append(Fore.RED + "无有效延迟数据（全部请求失败）")
     else:
-        print(Fore.RED + "无有效延迟数据（可能全部请求失败）")
+        # 延迟以纳秒记录，展示时换算为毫秒；最小/最大为精确值，平均值与百分位来自直方图
+        has_samples = hist is not None and hist.get_total_count() > 0
+        if has_samples:
+            lines.append(Fore.YELLOW + f"平均延迟(ms)   : {hist.get_mean_value() / 1_000_000:.2f}")
+        lines.append(Fore.YELLOW + f"最小延迟(ms)   : {collected_stats['min_ns'] / 1_000_000:.2f}")
+        lines.append(Fore.YELLOW + f"最大延迟(ms)   : {collected_stats['max_ns'] / 1_000_000:.2f}")
+        if has_samples:
+            lines.append(Fore.YELLOW + f"P50 延迟(ms)   : {hist.get_value_at_percentile(50) / 1_000_000:.2f}")
+            lines.append(Fore.YELLOW + f"P95 延迟(ms)   : {hist.get_value_at_percentile(95) / 1_000_000:.2f}")
+            lines.append(Fore.YELLOW + f"P99 延迟(ms)   : {hist.get_value_at_percentile(99) / 1_000_000:.2f}")
+            lines.append(Fore.YELLOW + f"P99.9 延迟(ms) : {hist.get_value_at_percentile(99.9) / 1_000_000:.2f}")
+
+    rps_lines = []
+    rps_start_sec = collected_stats["rps_start_sec"]
+    for offset, count in enumerate(collected_stats["req_per_second"]):
+        if count:
+            sec = rps_start_sec + offset
+            rps_lines.append(Fore.CYAN + f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(sec))} → {count} 次")
+
+    sys.stdout.write(
+        _STATS_BANNER
+        + "".join(line + Style.RESET_ALL + "\n" for line in lines)
+        + _RPS_BANNER
+        + "".join(line + Style.RESET_ALL + "\n" for line in rps_lines)
+    )
+    sys.stdout.flush()
+
+def build_summary(collected_stats: dict, total_requests: int, interrupted: bool) -> dict:
+    """
+    生成机器可读的统计摘要（延迟单位：毫秒），供 --json-out / --csv-out 导出及 --baseline 对比。
+    吞吐 ops_per_sec 只计成功请求，失败（往往很快返回）不会抬高吞吐。
+    最小/最大延迟取精确的 min_ns / max_ns，没有成功请求时为 None；直方图为空时平均值与百分位为 None。
+    """
+    success = collected_stats["success"]
+    duration_s = collected_stats["duration_s"]
+    min_ns = collected_stats["min_ns"]
+    hist = collected_stats["histogram"]
+
+    summary = {
+        "total": total_requests,
+        "success": success,
+        "failure": collected_stats["failure"],
+        "success_rate": round(success / total_requests * 100, 2) if total_requests > 0 else 0.0,
+        "ops_per_sec": round(success / duration_s, 2) if duration_s > 0 else 0.0,
+        "p50": None,
+        "p95": None,
+        "p99": None,
+        "p999": None,
+        "max": None,
+        "min": None,
+        "mean": None,
+        "duration_s": round(duration_s, 3),
+        "interrupted": interrupted,
+    }
+    if min_ns is not None:
+        summary["max"] = round(collected_stats["max_ns"] / 1_000_000, 3)
+        summary["min"] = round(min_ns / 1_000_000, 3)
+    if hist is not None and hist.get_total_count() > 0:
+        for key, percentile in (("p50", 50), ("p95", 95), ("p99", 99), ("p999", 99.9)):
+            summary[key] = round(hist.get_value_at_percentile(percentile) / 1_000_000, 3)
+        summary["mean"] = round(hist.get_mean_value() / 1_000_000, 3)
+    return summary
+
+def write_summary(summary: dict, json_out: str = "", csv_out: str = ""):
+    """
+    将统计摘要写入 JSON 文件和/或 CSV 文件（表头 + 一行数据），路径为空则跳过。
+    """
+    if json_out:
+        with open(json_out, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+    if csv_out:
+        with open(csv_out, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(summary))
+            writer.writeheader()
+            writer.writerow(summary)
+
+def compare_with_baseline(baseline: dict, current: dict,
+                          max_ops_drop: float = BASELINE_MAX_OPS_DROP,
+                          max_p99_rise: float = BASELINE_MAX_P99_RISE,
+                          max_success_rate_drop: float = BASELINE_MAX_SUCCESS_RATE_DROP) -> list:
+    """
+    将本次摘要与基线摘要（之前 --json-out 的输出）对比，返回回退说明列表；列表为空表示未回退。
+      - 成功吞吐 ops_per_sec 比基线下降超过 max_ops_drop；
+      - P99 延迟比基线上升超过 max_p99_rise；基线有 P99 而本次没有（全部失败）同样视为回退；
+      - 成功率 success_rate 比基线下降超过 max_success_rate_drop 个百分点。
+    基线缺少对应指标时跳过该项。
+    """
+    regressions = []
+
+    base_ops = baseline.get("ops_per_sec") or 0
+    cur_ops = current.get("ops_per_sec") or 0
+    if base_ops > 0 and cur_ops < base_ops * (1 - max_ops_drop):
+        regressions.append(f"成功吞吐下降 {(1 - cur_ops / base_ops) * 100:.1f}%："
+                           f"{base_ops:.2f} → {cur_ops:.2f} 次/秒（阈值 {max_ops_drop * 100:.0f}%）")
+
+    base_p99 = baseline.get("p99")
+    cur_p99 = current.get("p99")
+    if base_p99 and cur_p99 is None:
+        regressions.append(f"本次没有成功请求的延迟数据，无法与基线 P99 {base_p99:.2f} ms 对比")
+    elif base_p99 and cur_p99 > base_p99 * (1 + max_p99_rise):
+        regressions.append(f"P99 上升 {(cur_p99 / base_p99 - 1) * 100:.1f}%："
+                           f"{base_p99:.2f} → {cur_p99:.2f} ms（阈值 {max_p99_rise * 100:.0f}%）")
+
+    base_rate = baseline.get("success_rate")
+    cur_rate = current.get("success_rate") or 0.0
+    if base_rate is not None and cur_rate < base_rate - max_success_rate_drop:
+        regressions.append(f"成功率下降 {base_rate - cur_rate:.2f} 个百分点："
+                           f"{base_rate:.2f}% → {cur_rate:.2f}%（阈值 {max_success_rate_drop:.0f} 个百分点）")
+
+    return regressions
+
+def init_stats(total: int, qps: float, timeout: float):
+    """
+    为一次压测（或多进程模式下的一个分片）重置 stats：计数清零、创建延迟直方图、预分配每秒请求数计数。
+    """
+    stats["success"] = 0
+    stats["failure"] = 0
+    stats["duration_s"] = 0.0
+    stats["min_ns"] = None
+    stats["max_ns"] = 0
+    # 延迟直方图：1 纳秒 ~ max(60 秒, 超时时间)，3 位有效数字
+    stats["histogram"] = HdrHistogram(1, max(LATENCY_MAX_NS, int(timeout * 1_000_000_000)), 3)
+    # 每秒请求数计数：按预计时长（限速时为 total / qps 秒）再加 60 秒余量预分配
+    stats["rps_start_sec"] = int(time.time())
+    stats["req_per_second"] = array('q', bytes(8 * (int(total / qps if qps > 0 else 0) + 60)))
+
+def merge_stats(shard: dict):
+    """
+    将子进程 run_shard 返回的统计结果合并进当前进程的 stats。
+    """
+    stats["success"] += shard["success"]
+    stats["failure"] += shard["failure"]
+    # 各子进程并行运行，整体耗时取最长的一个
+    stats["duration_s"] = max(stats["duration_s"], shard["duration_s"])
+    if shard["min_ns"] is not None and (stats["min_ns"] is None or shard["min_ns"] < stats["min_ns"]):
+        stats["min_ns"] = shard["min_ns"]
+    stats["max_ns"] = max(stats["max_ns"], shard["max_ns"])
+    stats["histogram"].decode_and_add(shard["histogram"])
+    rps = stats["req_per_second"]
+    base = shard["rps_start_sec"] - stats["rps_start_sec"]
+    for offset, count in enumerate(shard["req_per_second"]):
+        if count:
+            idx = base + offset
+            if idx >= len(rps):
+                rps.frombytes(bytes(8 * (idx - len(rps) + 60)))
+            rps[idx] += count
+
+async def run_load(server: JavaServer, total: int, concurrency: int, qps: float, timeout: float,
+                   retries: int, sample_rate: int, warmup: int, logger, quiet: bool = False) -> bool:
+    """
+    warmup > 0 时先调用 warm_up 发出预热请求，之后才开始计时与统计。
+    在单个事件循环内完成压测：按 QPS 节奏创建任务，创建前先从 asyncio.Semaphore 取得并发名额，
+    任务完成时在回调中归还名额并刷新“完成”进度条。同时存活的任务数不超过 concurrency，
+    内存占用与 total 无关。
+    quiet=True 时（多进程子进程）不绘制进度条、不在控制台打印，完成数由 run_one 汇报给父进程。
+    按 Ctrl+C 时取消尚未完成的任务并返回 True；正常完成返回 False。
+    """
+    loop = asyncio.get_running_loop()
+    rps = stats["req_per_second"]
+    rps_start_sec = stats["rps_start_sec"]
+    main_task = asyncio.current_task()
+    try:
+        loop.add_signal_handler(signal.SIGINT, main_task.cancel)
+    except NotImplementedError:
+        # Windows 事件循环不支持 add_signal_handler，由 main 中捕获 KeyboardInterrupt 兜底
+        pass
+
+    slots = asyncio.Semaphore(concurrency)
+    # 如果 qps > 0，计算每次创建任务前的延迟（秒）；为 0 时仍 sleep(0) 让出事件循环
+    delay_per_req = 1.0 / qps if qps > 0 else 0
+
+    in_flight = set()
+    completed = 0
+    load_start = None
+
+    def on_done(task: asyncio.Task):
+        nonlocal completed
+        in_flight.discard(task)
+        slots.release()
+        if task.cancelled():
+            return
+        completed += 1
+        if quiet:
+            return
+        error = task.result()
+        if error is not None:
+            # 失败：先换行，再打印错误到控制台，最后重画进度条
+            print()
+            print(Fore.RED + f"[错误] {time.strftime('%H:%M:%S')} 查询失败：{error}" + Style.RESET_ALL)
+            draw_progress("完成", completed, total, force=True)
+        else:
+            draw_progress("完成", completed, total)
+
+    try:
+        if warmup > 0:
+            await warm_up(server, warmup, concurrency, delay_per_req, timeout, logger)
+
+        load_start = time.monotonic()
+        if not quiet:
+            draw_progress("完成", completed, total, force=True)
+
+        for i in range(total):
+            await asyncio.sleep(delay_per_req)
+            await slots.acquire()
+
+            # 记录本次请求属于哪一个秒（相对起始秒的偏移），超出预分配长度时补零扩容
+            idx = int(time.time()) - rps_start_sec
+            if idx >= len(rps):
+                rps.frombytes(bytes(8 * (idx - len(rps) + 60)))
+            rps[idx] += 1
+
+            task = asyncio.ensure_future(run_one(server, timeout, retries, sample_rate, logger))
+            in_flight.add(task)
+            task.add_done_callback(on_done)
+
+        logger.info("所有请求已发出")
+
+        # 等待最后一批在途任务完成
+        if in_flight:
+            await asyncio.wait(in_flight)
+
+    except asyncio.CancelledError:
+        # 捕获 Ctrl+C：停止创建新任务，取消仍在途的任务，已完成的结果已计入 stats
+        for task in list(in_flight):
+            task.cancel()
+        return True
+    finally:
+        if load_start is not None:
+            stats["duration_s"] = time.monotonic() - load_start
+        try:
+            loop.remove_signal_handler(signal.SIGINT)
+        except NotImplementedError:
+            pass
+
+    return False
+
+def _init_worker(logfile: str, completed_counter):
+    """
+    ProcessPoolExecutor 子进程初始化：保存共享计数器，并重新配置日志与 DNS 缓存。
+    fork 启动时会继承父进程的 QueueHandler，但其后台监听线程不会随 fork 复制，因此先移除再重新配置；
+    子进程以 os._exit 退出、不执行 atexit，文件日志改为直接写入。
+    """
+    global _shared_completed
+    _shared_completed = completed_counter
+    logger = logging.getLogger("motd_stress")
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    setup_logging(logfile if logfile else None, background=False)
+    install_dns_cache()
+
+def run_shard(server: JavaServer, total: int, concurrency: int, qps: float,
+              timeout: float, retries: int, sample_rate: int, warmup: int) -> dict:
+    """
+    子进程入口：在独立的事件循环中完成分配到的请求，返回可跨进程传递（可 pickle）的统计结果。
+    """
+    logger = logging.getLogger("motd_stress")
+    init_stats(total, qps, timeout)
+    interrupted = asyncio.run(run_load(server, total, concurrency, qps, timeout, retries, sample_rate,
+                                       warmup, logger, quiet=True))
+    return {
+        "success": stats["success"],
+        "failure": stats["failure"],
+        "duration_s": stats["duration_s"],
+        "min_ns": stats["min_ns"],
+        "max_ns": stats["max_ns"],
+        "histogram": stats["histogram"].encode(),
+        "rps_start_sec": stats["rps_start_sec"],
+        "req_per_second": stats["req_per_second"],
+        "interrupted": interrupted,
+    }
+
+def _split(n: int, parts: int, index: int) -> int:
+    """
+    将 n 尽量均分为 parts 份，返回第 index 份的大小（前 n % parts 份各多 1）。
+    """
+    return n // parts + (1 if index < n % parts else 0)
+
+def run_multiprocess(server: JavaServer, total: int, concurrency: int, qps: int, timeout: float, retries: int,
+                     sample_rate: int, warmup: int, processes: int, logfile: str, logger) -> bool:
+    """
+    多进程压测：把总请求数、并发数和 QPS 均分给 processes 个子进程，每个子进程运行独立的事件循环，
+    从而让 mcstatus 的协议解析分摊到多个 CPU 核心上，不再受单个解释器 GIL 限制。
+    父进程根据共享计数器绘制“完成”进度条，并在结束后合并各子进程的统计结果。
+    每个子进程都是冷启动，因此各自执行 warmup 次预热请求。
+    按 Ctrl+C 时各子进程自行取消在途任务并返回已完成部分，返回 True；正常完成返回 False。
+    """
+    completed_counter = multiprocessing.Value('q', 0)
+    interrupted = [False]
 
-    print(Fore.MAGENTA + "\n===== 每秒请求数 (REQ/s) =====")
-    for sec in sorted(req_per_second):
-        print(Fore.CYAN + f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(sec))} → {req_per_second[sec]} 次")
+    def on_sigint(signum, frame):
+        # 父进程只记录中断标志，继续等待子进程返回已完成部分的统计
+        interrupted[0] = True
+
+    previous_handler = signal.signal(signal.SIGINT, on_sigint)
+    try:
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                 initargs=(logfile, completed_counter)) as executor:
+            futures = [
+                executor.submit(run_shard, server, _split(total, processes, i), _split(concurrency, processes, i),
+                                qps / processes, timeout, retries, sample_rate, warmup)
+                for i in range(processes)
+            ]
+            draw_progress("完成", 0, total, force=True)
+            pending = futures
+            while pending:
+                _, pending = wait(pending, timeout=1 / PROGRESS_MAX_FPS)
+                draw_progress("完成", completed_counter.value, total)
+
+            for fut in futures:
+                try:
+                    shard = fut.result()
+                except Exception as e:
+                    logger.error(f"压测子进程异常退出：{e}")
+                    continue
+                merge_stats(shard)
+                interrupted[0] = interrupted[0] or shard["interrupted"]
+    finally:
+        signal.signal(signal.SIGINT, previous_handler)
+
+    return interrupted[0]
 
 def main():
     parser = argparse.ArgumentParser(
@@ -276,12 +764,23 @@ def main():
     parser.add_argument("--host", "-H", type=str, required=False, help="目标服务器地址或 IP（必填）")
     parser.add_argument("--port", "-P", type=int, default=25565, help="目标服务器端口，默认为 25565")
     parser.add_argument("--concurrency", "-c", type=int, default=50,
-                        help="并发线程数（最大同时查询数量），默认 50，须为正整数")
+                        help="并发数（最大同时查询数量），默认 50，须为正整数")
     parser.add_argument("--total", "-n", type=int, required=False, help="总请求次数（必填），须为正整数")
     parser.add_argument("--qps", "-q", type=int, default=0, help="全局限速（每秒最大请求数），默认 0（不限制），须为非负整数")
     parser.add_argument("--timeout", "-t", type=float, default=5.0, help="单次查询超时（秒），默认 5 秒，须为正数")
     parser.add_argument("--retries", "-r", type=int, default=0, help="失败重试次数，默认 0 次，须为非负整数")
     parser.add_argument("--logfile", "-l", type=str, default="", help="可选：指定日志文件路径，将 INFO 及以上日志写入文件")
+    parser.add_argument("--sample-rate", "-s", type=int, default=1,
+                        help="延迟采样间隔：每 N 个成功请求记录 1 次延迟，默认 1（全部记录），须为正整数")
+    parser.add_argument("--warmup", "-w", type=int, default=0,
+                        help="正式计时前的预热请求数（不计入统计，同样遵守 --qps 限速），默认 0，建议 32，须为非负整数")
+    parser.add_argument("--json-out", type=str, default="", help="可选：将统计摘要以 JSON 格式写入该文件")
+    parser.add_argument("--csv-out", type=str, default="", help="可选：将统计摘要以 CSV 格式写入该文件")
+    parser.add_argument("--baseline", type=str, default="",
+                        help="可选：与之前 --json-out 生成的基线对比，成功吞吐下降超过 10%、P99 上升超过 20% "
+                             "或成功率下降超过 1 个百分点时以非零状态退出")
+    parser.add_argument("--processes", "-j", type=int, default=1,
+                        help="压测进程数，默认 1（单进程）；0 表示使用全部 CPU 核心，须为非负整数")
 
     # 如果用户只传了 -help 或 --help，就显示彩色帮助并退出
     if any(arg in ("-help", "--help") for arg in sys.argv[1:]):
@@ -292,16 +791,17 @@ def main():
 
     # 参数校验
     if not args.host or args.total is None:
-        print(Fore.RED + "[错误] 必须指定 --host 和 --total 参数。")
-        print(Fore.CYAN + "使用 -help 查看帮助信息。")
+        print(Fore.RED + "[错误] 必须指定 --host 和 --total 参数。" + Style.RESET_ALL)
+        print(Fore.CYAN + "使用 -help 查看帮助信息。" + Style.RESET_ALL)
         sys.exit(1)
 
-    if args.concurrency <= 0 or args.total <= 0 or args.qps < 0 or args.timeout <= 0 or args.retries < 0:
+    if (args.concurrency <= 0 or args.total <= 0 or args.qps < 0 or args.timeout <= 0
+            or args.retries < 0 or args.processes < 0 or args.sample_rate <= 0 or args.warmup < 0):
         print(Fore.RED + "[错误] 参数校验失败：\n"
-              "  • --concurrency、--total 必须为正整数；\n"
-              "  • --qps、--retries 必须为非负整数；\n"
-              "  • --timeout 必须为正数。")
-        print(Fore.CYAN + "使用 -help 查看帮助信息。")
+              "  • --concurrency、--total、--sample-rate 必须为正整数；\n"
+              "  • --qps、--retries、--warmup、--processes 必须为非负整数；\n"
+              "  • --timeout 必须为正数。" + Style.RESET_ALL)
+        print(Fore.CYAN + "使用 -help 查看帮助信息。" + Style.RESET_ALL)
         sys.exit(1)
 
     host = args.host
@@ -312,139 +812,136 @@ def main():
     timeout = args.timeout
     retries = args.retries
     logfile = args.logfile
+    sample_rate = args.sample_rate
+    warmup = args.warmup
+    json_out = args.json_out
+    csv_out = args.csv_out
+    baseline_path = args.baseline
+    # 基线在压测前读取并校验，避免路径写错或文件损坏在长时间压测结束后才暴露
+    baseline = None
+    if baseline_path:
+        try:
+            with open(baseline_path, encoding="utf-8") as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            print(Fore.RED + f"[错误] 无法读取基线文件 {baseline_path}：{e}" + Style.RESET_ALL)
+            sys.exit(1)
+        if not isinstance(baseline, dict):
+            print(Fore.RED + f"[错误] 基线文件 {baseline_path} 不是 --json-out 生成的 JSON 对象。" + Style.RESET_ALL)
+            sys.exit(1)
+    # 进程数不超过请求数和并发数，保证每个子进程至少分到 1 个请求和 1 个并发
+    processes = min(args.processes or os.cpu_count() or 1, total, concurrency)
 
     # 设置日志
     logger = setup_logging(logfile if logfile else None)
     logger.info(f"启动压测：host={host}, port={port}, concurrency={concurrency}, "
                 f"total={total}, qps={qps}, timeout={timeout}, retries={retries}, "
-                f"logfile={logfile or '无'}")
+                f"logfile={logfile or '无'}, processes={processes}, sample_rate={sample_rate}, warmup={warmup}")
+
+    # mcstatus 内部若再次解析地址，也直接命中缓存
+    install_dns_cache()
 
     # 构造 JavaServer 对象
+    # IPv6 字面量（如 ::1）需加方括号，mcstatus 才能区分地址与端口
+    address = f"[{host}]:{port}" if ":" in host and not host.startswith("[") else f"{host}:{port}"
     try:
-        server = JavaServer.lookup(f"{host}:{port}")  # 优先解析域名
-        logger.info(f"域名 {host} 已解析并使用 IP 进行连接。")
-    except Exception:
+        server = JavaServer.lookup(address)  # 优先解析域名（含 SRV 记录）
+    except Exception as e:
         server = JavaServer(host, port)
-        logger.warning("域名解析失败或直接使用域名连接。")
-
-    # 第一步：ping 服务器并渲染 MOTD 颜色
-    print(Fore.CYAN + f"正在 ping {host}:{port} …")
+        logger.warning(f"SRV/地址查询失败（{e}），直接使用 {host}:{port} 连接。")
+    # 只做一次 DNS 解析，之后所有请求共用同一个按 IP 构造的 JavaServer，避免每次请求重新解析；
+    # getaddrinfo 同时支持 IPv4 与 IPv6（AAAA），保留全部候选地址（去重、保持系统给出的顺序）
     try:
-        raw_motd, online, maximum, version_name, latency = ping_server(server, timeout)
-        logger.info("Ping 成功")
+        infos = socket.getaddrinfo(server.address.host, server.address.port, type=socket.SOCK_STREAM)
+        resolved_ips = list(dict.fromkeys(info[4][0] for info in infos))
+        candidates = [JavaServer(ip, server.address.port) for ip in resolved_ips]
+        logger.info(f"域名 {host} 已解析为 {', '.join(resolved_ips)}，将依次尝试并使用第一个可连通的 IP。")
+    except OSError as e:
+        # 保留 lookup() 得到的地址与端口（可能来自 SRV），由 mcstatus 在连接时自行解析
+        candidates = [server]
+        logger.warning(f"预先解析 {server.address.host} 失败（{e}），将在连接时解析。")
+
+    # 第一步：ping 服务器并渲染 MOTD 颜色；依次尝试各候选地址（如双栈主机的 IPv6 不通时回退到 IPv4），
+    # 压测固定使用第一个 ping 成功的地址
+    print(Fore.CYAN + f"正在 ping {host}:{port} …" + Style.RESET_ALL)
+    try:
+        for index, candidate in enumerate(candidates):
+            try:
+                raw_motd, online, maximum, version_name, latency = ping_server(candidate, timeout)
+            except Exception as e:
+                if index == len(candidates) - 1:
+                    raise
+                logger.warning(f"地址 {candidate.address.host} ping 失败（{e}），尝试下一个地址。")
+                continue
+            server = candidate
+            break
+        logger.info(f"Ping 成功，压测使用地址 {server.address.host}:{server.address.port}")
         colored_motd = parse_motd(raw_motd)
-        print(Fore.GREEN + "====== 服务器基本信息 ======")
-        print(Fore.YELLOW + "MOTD             : " + colored_motd)
-        print(Fore.YELLOW + f"在线玩家数       : {online}/{maximum}")
-        print(Fore.YELLOW + f"服务端版本       : {version_name}")
-        print(Fore.YELLOW + f"单次 ping 延迟   : {latency:.2f} ms")
-        print(Fore.GREEN + "============================\n")
+        print(Fore.GREEN + "====== 服务器基本信息 ======" + Style.RESET_ALL)
+        print(Fore.YELLOW + "MOTD             : " + colored_motd)  # parse_motd 已在末尾重置
+        print(Fore.YELLOW + f"在线玩家数       : {online}/{maximum}" + Style.RESET_ALL)
+        print(Fore.YELLOW + f"服务端版本       : {version_name}" + Style.RESET_ALL)
+        print(Fore.YELLOW + f"单次 ping 延迟   : {latency:.2f} ms" + Style.RESET_ALL)
+        print(Fore.GREEN + "============================" + Style.RESET_ALL + "\n")
     except Exception as e:
         logger.error(f"ping 失败：{e}")
-        print(Fore.RED + f"[错误] 无法 ping 到服务器 {host}:{port}，异常：{e}")
-        print(Fore.RED + "请确认服务器地址、端口及网络可达性。")
+        print(Fore.RED + f"[错误] 无法 ping 到服务器 {host}:{port}，异常：{e}" + Style.RESET_ALL)
+        print(Fore.RED + "请确认服务器地址、端口及网络可达性。" + Style.RESET_ALL)
         sys.exit(1)
 
     # 第二步：开始压力测试
-    print(Fore.CYAN + f"开始对 {host}:{port} 进行 MOTD 压测，共 {total} 次请求，最大并发 {concurrency}，QPS 限制 {qps}")
-    print(Fore.CYAN + "按 Ctrl+C 可随时中断并查看已完成统计\n")
+    print(Fore.CYAN + f"开始对 {host}:{port} 进行 MOTD 压测，共 {total} 次请求，最大并发 {concurrency}，QPS 限制 {qps}，进程数 {processes}" + Style.RESET_ALL)
+    if warmup > 0:
+        print(Fore.CYAN + f"计时前先发出 {warmup} 次预热请求（每个进程各一轮），结果不计入统计" + Style.RESET_ALL)
+    print(Fore.CYAN + "按 Ctrl+C 可随时中断并查看已完成统计" + Style.RESET_ALL + "\n")
     logger.info("进入压力测试阶段")
 
-    # 如果 qps > 0，计算每次提交任务前的延迟（秒）
-    delay_per_req = 1.0 / qps if qps > 0 else 0
-
-    futures = []
-    submitted = 0
+    init_stats(total, qps, timeout)
 
     try:
-        with ThreadPoolExecutor(max_workers=concurrency) as executor:
-            start_time = time.monotonic()
-
-            # 1. 提交所有请求任务，同时显示“提交中”进度条
-            for i in range(total):
-                if delay_per_req > 0:
-                    time.sleep(delay_per_req)
-
-                # 记录本次请求属于哪一个秒
-                sec = int(time.time())
-                req_per_second[sec] += 1
-
-                # 提交任务
-                future = executor.submit(query_motd_sync, server, timeout, retries, logger)
-                futures.append(future)
-                submitted += 1
-
-                # 绘制“提交中”进度条
-                draw_progress("提交中", submitted, total)
-
-                # 每 500 次提交时，打印简要提示，不影响进度条
-                if submitted % 500 == 0:
-                    elapsed = time.monotonic() - start_time
-                    print(Fore.YELLOW + f"\n[{time.strftime('%H:%M:%S')}] 已提交 {submitted}/{total} 次请求，用时 {elapsed:.2f} 秒")
-
-            # 确保“提交中”阶段的进度条显示为 100%
-            draw_progress("提交中", total, total)
-            logger.info("所有请求提交完毕")
-
-            # 2. 收集结果，并在同一行刷新“收集中”进度条
-            completed = 0
-            draw_progress("收集中", completed, total)
-            for fut in as_completed(futures):
-                try:
-                    elapsed_ms = fut.result()
-                    with stats_lock:
-                        stats["success"] += 1
-                        stats["latencies"].append(elapsed_ms)
-                except Exception as e:
-                    # 失败：先换行，再打印错误到控制台，最后重画进度条
-                    print()
-                    print(Fore.RED + f"[错误] {time.strftime('%H:%M:%S')} 查询失败：{e}")
-                    draw_progress("收集中", completed, total)
-                    logger.error(f"查询失败：{e}")
-                    with stats_lock:
-                        stats["failure"] += 1
-                else:
-                    # 成功：只写日志文件，不打印到控制台
-                    with stats_lock:
-                        stats["success"] += 1
-                completed += 1
-                draw_progress("收集中", completed, total)
-
+        if processes > 1:
+            interrupted = run_multiprocess(server, total, concurrency, qps, timeout, retries, sample_rate,
+                                           warmup, processes, logfile, logger)
+        else:
+            interrupted = asyncio.run(run_load(server, total, concurrency, qps, timeout, retries, sample_rate,
+                                               warmup, logger))
     except KeyboardInterrupt:
-        # 捕获 Ctrl+C：停止提交并收集已完成的任务
-        print(Fore.RED + "\n检测到 Ctrl+C 中断，停止提交新任务并只汇总已完成任务结果...")
-        logger.warning("用户通过 Ctrl+C 中断")
-
-        # 等待短暂停顿，确保正在运行的任务有机会完成
-        time.sleep(0.1)
+        interrupted = True
 
-        done_count = 0
-        for fut in futures:
-            if fut.done():
-                try:
-                    elapsed_ms = fut.result()
-                    with stats_lock:
-                        stats["success"] += 1
-                        stats["latencies"].append(elapsed_ms)
-                except Exception:
-                    with stats_lock:
-                        stats["failure"] += 1
-                done_count += 1
-
-        # 在中断时绘制“提交中”和“收集中”进度条
-        draw_progress("提交中", total if submitted >= total else submitted, total)
-        draw_progress("收集中", done_count, total)
+    if interrupted:
+        print(Fore.RED + "\n检测到 Ctrl+C 中断，停止提交新任务并只汇总已完成任务结果..." + Style.RESET_ALL)
+        logger.warning("用户通过 Ctrl+C 中断")
+        done_count = stats["success"] + stats["failure"]
+        draw_progress("完成", done_count, total, force=True)
         print_stats(stats, done_count)
+        write_summary(build_summary(stats, done_count, interrupted), json_out, csv_out)
         logger.info("中断时统计已完成任务结果")
+        if baseline is not None:
+            # 被中断（如 CI 取消任务）的运行不能视为通过基线对比，以非零状态退出
+            print(Fore.RED + "\n压测被中断，未完成与基线的对比，以非零状态退出。" + Style.RESET_ALL)
+            logger.warning("压测被中断，未完成与基线的对比")
+            sys.exit(1)
         sys.exit(0)
 
-    # 正常完成所有任务后，绘制满进度条并打印最终统计
-    draw_progress("提交中", total, total)
-    draw_progress("收集中", total, total)
+    # 正常完成所有任务后，打印最终统计
     total_requests = stats["success"] + stats["failure"]
     print_stats(stats, total_requests)
+    summary = build_summary(stats, total_requests, interrupted)
+    write_summary(summary, json_out, csv_out)
     logger.info("压测结束，打印统计结果")
 
+    # 与基线对比，发现回退时以非零状态退出，便于在脚本/CI 中自动判定
+    if baseline is not None:
+        regressions = compare_with_baseline(baseline, summary)
+        if regressions:
+            print(Fore.RED + "\n===== 与基线对比：发现性能回退 =====" + Style.RESET_ALL)
+            for message in regressions:
+                print(Fore.RED + f"  • {message}" + Style.RESET_ALL)
+                logger.warning(f"性能回退：{message}")
+            sys.exit(1)
+        print(Fore.GREEN + "\n与基线对比：未发现性能回退" + Style.RESET_ALL)
+        logger.info("与基线对比：未发现性能回退")
+
 
 if __name__ == "__main__":
     main()